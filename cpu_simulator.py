@@ -1,23 +1,31 @@
 from enum import Enum
+import heapq
 import time
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Union
+from undo_journal import UndoJournal
 
 class CPUMode(Enum):
     KERNEL = 0
     USER = 1
 
+IO_BLOCK_CYCLES = 100  # Cycles a thread stays blocked after an I/O syscall
+
 class CPU:
     def __init__(self, memory_size: int = 11000, debug_level: int = 0):
         self.memory: List[Union[int, str]] = [0] * memory_size
         self.halted = False
         self.mode = CPUMode.KERNEL
         self.blocked_cycles = 0
+        self.io_timers = []  # Heap of (wake_time, thread_id) for blocked threads
+        self.idle = False  # True while every thread is blocked on I/O
+        self.idle_cycles = 0
         self.instruction_addresses = set()  # Track instruction locations
         self.data_addresses = set()  # Track data locations
         self.debug_level = debug_level
         self.instruction_counter = 0
         self.last_pc = -1  # Track last PC for loop detection
         self.same_pc_count = 0  # Count how many times we've seen the same PC
+        self.journal: Optional[UndoJournal] = None  # Undo log for reverse stepping
         
     def is_halted(self) -> bool:
         return self.halted
@@ -30,6 +38,8 @@ class CPU:
             print(f"Error: Program Counter {value} out of memory bounds")
             self.halted = True
             return
+        if self.journal is not None:
+            self.journal.record(0, self.memory[0])
         self.memory[0] = value
         
     def increment_pc(self):
@@ -43,6 +53,8 @@ class CPU:
             print(f"Error: Stack Pointer {value} out of memory bounds")
             self.halted = True
             return
+        if self.journal is not None:
+            self.journal.record(1, self.memory[1])
         self.memory[1] = value
         
     def check_user_mode_access(self, address: int):
@@ -101,6 +113,8 @@ class CPU:
         self.data_addresses.discard(address)
         
         # Update memory and track type
+        if self.journal is not None:
+            self.journal.record(address, self.memory[address])
         self.memory[address] = value
         if isinstance(value, str):
             self.instruction_addresses.add(address)
@@ -209,13 +223,114 @@ class CPU:
                 return thread_id
         
         return 0  # No ready thread found
-            
+
+    def schedule_next_thread(self):
+        """Switch to the next ready thread, idle if threads are blocked, else halt."""
+        next_thread = self.find_next_ready_thread()
+        if next_thread > 0:
+            self.mode = CPUMode.KERNEL
+            self.switch_thread(next_thread)
+            self.idle = False
+            self.same_pc_count = 0
+            self.last_pc = -1
+        elif self.io_timers:
+            # Everyone is waiting on I/O, burn idle cycles until a wake-up
+            self.idle = True
+        else:
+            self.halted = True
+
+    def block_current_thread(self, cycles: int):
+        """Block the current thread for an I/O operation and let others run."""
+        self.mode = CPUMode.KERNEL
+        current_thread = self.get_memory_value(4)
+        if current_thread <= 0:
+            # No thread context (kernel code), stall the whole CPU instead
+            self.blocked_cycles = cycles
+            return
+
+        thread_table_base = self.get_memory_value(6)
+        thread_base = thread_table_base + (current_thread - 1) * 20
+        self.set_memory_value(thread_base + 3, 3)  # Set state to blocked
+        self.update_thread_state()
+
+        wake_time = self.get_memory_value(3) + cycles
+        heapq.heappush(self.io_timers, (wake_time, current_thread))
+
+        if self.debug_level >= 2:
+            print(f"Thread {current_thread} blocked until {wake_time}")
+
+        self.schedule_next_thread()
+
+    def wake_blocked_threads(self):
+        """Move threads whose I/O has completed back to the ready state."""
+        # I/O completion is handled by the kernel, like an interrupt
+        mode = self.mode
+        self.mode = CPUMode.KERNEL
+        now = self.get_memory_value(3)
+        thread_table_base = self.get_memory_value(6)
+        while self.io_timers and self.io_timers[0][0] <= now:
+            _, thread_id = heapq.heappop(self.io_timers)
+            thread_base = thread_table_base + (thread_id - 1) * 20
+            if self.get_memory_value(thread_base + 3) == 3:
+                self.set_memory_value(thread_base + 3, 1)  # Set state to ready
+                if self.debug_level >= 2:
+                    print(f"Thread {thread_id} woke up at {now}")
+        self.mode = mode
+
+    def enable_journal(self, capacity: int = 10000):
+        """Start recording an undo log of the last `capacity` cycles."""
+        self.journal = UndoJournal(capacity)
+
+    def disable_journal(self):
+        """Stop recording and drop the undo log."""
+        self.journal = None
+
+    def step_back(self, count: int = 1) -> int:
+        """Undo up to `count` cycles and return how many were undone."""
+        if self.journal is None:
+            print("Error: Undo journal is not enabled")
+            return 0
+        undone = 0
+        while undone < count and self.journal.undo(self) is not None:
+            undone += 1
+        return undone
+
+    def run_back(self, pc: Optional[int] = None, watch: Optional[int] = None) -> bool:
+        """Undo cycles until PC equals `pc` or the cycle that wrote `watch` is undone."""
+        if self.journal is None:
+            print("Error: Undo journal is not enabled")
+            return False
+        while True:
+            written = self.journal.undo(self)
+            if written is None:
+                return False  # Reached the oldest recorded cycle
+            if watch is not None and watch in written:
+                return True
+            if pc is not None and self.get_pc() == pc:
+                return True
+
     def execute(self):
+        if self.journal is not None:
+            self.journal.begin_step(self)
+
         # Infinite loop detection - more sophisticated version
         if not hasattr(self, 'instruction_counter'):
             self.instruction_counter = 0
         self.instruction_counter += 1
         
+        if self.io_timers:
+            self.wake_blocked_threads()
+
+        if self.idle:
+            # No thread is ready, so the CPU has nothing to do this cycle
+            if self.find_next_ready_thread() > 0:
+                self.schedule_next_thread()
+                return
+            self.idle_cycles += 1
+            current_count = self.memory[3]
+            self.set_memory_value(3, current_count + 1)  # Time still passes
+            return
+        
         current_pc = self.get_pc()
         if current_pc == self.last_pc:
             self.same_pc_count += 1
@@ -245,6 +360,12 @@ class CPU:
                     self.same_pc_count = 0
                     self.last_pc = -1
                     return
+                elif self.io_timers:
+                    # Other threads are still waiting on I/O
+                    self.idle = True
+                    self.same_pc_count = 0
+                    self.last_pc = -1
+                    return
                 else:
                     print("No other threads available, halting.")
                     self.halted = True
@@ -282,6 +403,8 @@ class CPU:
             next_thread = self.find_next_ready_thread()
             if next_thread > 0:
                 self.switch_thread(next_thread)
+            elif self.io_timers:
+                self.idle = True
             else:
                 self.halted = True
             
@@ -304,6 +427,7 @@ class CPU:
             return
             
         opcode = parts[0]
+        io_block = False
         
         try:
             if opcode == "SET":
@@ -440,7 +564,7 @@ class CPU:
                     addr = int(parts[2])
                     value = self.get_memory_value(addr, allow_instruction=True)
                     print(f"Output: {value}")
-                    self.blocked_cycles = 100
+                    io_block = True
                 elif syscall_type == "HLT":
                     # Current thread is done, set it to inactive
                     current_thread = self.get_memory_value(4)
@@ -467,6 +591,9 @@ class CPU:
                         
                         if hasattr(self, 'debug_level') and self.debug_level > 0:
                             print(f"Switched to thread {next_thread} at PC={self.get_pc()}")
+                    elif self.io_timers:
+                        # Remaining threads are blocked on I/O, wait for them
+                        self.idle = True
                     else:
                         # No more threads to run
                         self.halted = True
@@ -490,4 +617,8 @@ class CPU:
             
         self.increment_pc()
         current_count = self.get_memory_value(3, allow_instruction=True)
-        self.set_memory_value(3, current_count + 1)  # Increment instruction count
\ No newline at end of file
+        self.set_memory_value(3, current_count + 1)  # Increment instruction count
+        
+        if io_block:
+            # Resume after the syscall once the I/O completes
+            self.block_current_thread(IO_BLOCK_CYCLES)
@@ -26,6 +26,7 @@ def print_memory_state(cpu: CPU, file=sys.stderr):
     print(f"Instructions Executed: {cpu.memory[3]}", file=file)
     print(f"Current Thread: {cpu.memory[4]}", file=file)
     print(f"Active Threads: {cpu.memory[5]}", file=file)
+    print(f"Idle Cycles: {cpu.idle_cycles}", file=file)
     
     # Print thread table
     thread_table_base = cpu.memory[6]
@@ -50,16 +51,59 @@ def print_thread_state(cpu: CPU, file=sys.stderr):
         state = state_map.get(cpu.memory[base+3], "unknown")
         print(f"Thread {i+1}: {state} (PC: {cpu.memory[base+4]})", file=file)
 
+def journal_prompt(cpu: CPU):
+    """Read reverse-stepping commands from stdin until quit or end of input."""
+    print("\nJournal commands: step-back N, run-back pc X, run-back watch A, step, state, quit")
+    while True:
+        try:
+            line = input("journal> ").strip()
+        except EOFError:
+            return
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if parts[0] == "quit":
+                return
+            elif parts[0] == "step-back":
+                count = int(parts[1]) if len(parts) > 1 else 1
+                undone = cpu.step_back(count)
+                print(f"Stepped back {undone} cycles, PC={cpu.get_pc()}")
+            elif parts[0] == "run-back" and len(parts) == 3 and parts[1] in ("pc", "watch"):
+                target = int(parts[2])
+                if parts[1] == "pc":
+                    found = cpu.run_back(pc=target)
+                else:
+                    found = cpu.run_back(watch=target)
+                if not found:
+                    print("Reached the oldest recorded cycle")
+                print(f"PC={cpu.get_pc()}, thread={cpu.memory[4]}")
+            elif parts[0] == "step":
+                if not cpu.is_halted():
+                    cpu.execute()
+                print(f"PC={cpu.get_pc()}, thread={cpu.memory[4]}")
+            elif parts[0] == "state":
+                print_memory_state(cpu, file=sys.stdout)
+            else:
+                print(f"Unknown command: {line}")
+        except ValueError:
+            print(f"Invalid number in command: {line}")
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python simulator.py <filename> [-D debug_level]")
+        print("Usage: python simulator.py <filename> [-D debug_level] [-J journal_size]")
         sys.exit(1)
         
     filename = sys.argv[1]
     debug_level = 0
+    journal_size = 0
     
-    if len(sys.argv) > 2 and sys.argv[2] == "-D":
-        debug_level = int(sys.argv[3])
+    args = sys.argv[2:]
+    for i in range(0, len(args) - 1, 2):
+        if args[i] == "-D":
+            debug_level = int(args[i + 1])
+        elif args[i] == "-J":
+            journal_size = int(args[i + 1])
         
     # Initialize CPU and parser
     cpu = CPU(debug_level=debug_level)
@@ -70,14 +114,27 @@ def main():
         parser.parse_file(filename)
         parser.load_into_memory(cpu)
         
+        # Record after loading so the journal only holds executed cycles
+        if journal_size > 0:
+            cpu.enable_journal(journal_size)
+        
         # Main execution loop
         while not cpu.is_halted():
             if debug_level == 1:
                 print_memory_state(cpu)
             elif debug_level == 2:
                 print_memory_state(cpu)
-                print("\nPress any key to continue...")
-                wait_key()
+                if cpu.journal is not None:
+                    print("\nPress b to step back, : for journal commands, any other key to continue...")
+                else:
+                    print("\nPress any key to continue...")
+                key = wait_key()
+                if cpu.journal is not None and key == "b":
+                    cpu.step_back()
+                    continue
+                elif cpu.journal is not None and key == ":":
+                    journal_prompt(cpu)
+                    continue
             elif debug_level == 3:
                 old_thread = cpu.memory[4]
                 cpu.execute()
@@ -88,6 +145,10 @@ def main():
                 
             cpu.execute()
             
+        # Let the user rewind from wherever the program stopped
+        if cpu.journal is not None:
+            journal_prompt(cpu)
+            
         # Print final memory state
         print_memory_state(cpu)
         
@@ -0,0 +1,55 @@
+from collections import deque
+from typing import List, Optional, Tuple, Union
+
+class UndoJournal:
+    """Bounded ring of per-instruction undo records for reverse stepping.
+
+    Each record holds the CPU fields that live outside memory and a flat list
+    of (address, old value) pairs for the memory cells the instruction wrote.
+    When the ring is full the oldest record is dropped.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self.steps: deque = deque(maxlen=capacity)
+        self.current: Optional[List[Union[int, str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def begin_step(self, cpu) -> None:
+        """Open a new record before the CPU executes one cycle."""
+        self.current = []
+        state = (cpu.mode, cpu.halted, cpu.blocked_cycles, cpu.idle, cpu.idle_cycles,
+                 cpu.instruction_counter, cpu.last_pc, cpu.same_pc_count,
+                 tuple(cpu.io_timers))
+        self.steps.append((state, self.current))
+
+    def record(self, address: int, old_value: Union[int, str]) -> None:
+        """Remember the value a memory cell held before it is overwritten."""
+        if self.current is not None:
+            self.current.append(address)
+            self.current.append(old_value)
+
+    def undo(self, cpu) -> Optional[Tuple[int, ...]]:
+        """Revert the most recent record and return the addresses it restored."""
+        if not self.steps:
+            return None
+        state, writes = self.steps.pop()
+        self.current = None
+
+        # Restore newest writes first so a cell written twice ends up at its oldest value
+        for i in range(len(writes) - 2, -1, -2):
+            address, value = writes[i], writes[i + 1]
+            cpu.memory[address] = value
+            cpu.instruction_addresses.discard(address)
+            cpu.data_addresses.discard(address)
+            if isinstance(value, str):
+                cpu.instruction_addresses.add(address)
+            else:
+                cpu.data_addresses.add(address)
+
+        (cpu.mode, cpu.halted, cpu.blocked_cycles, cpu.idle, cpu.idle_cycles,
+         cpu.instruction_counter, cpu.last_pc, cpu.same_pc_count, io_timers) = state
+        cpu.io_timers = list(io_timers)
+        return tuple(writes[0::2])